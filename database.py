@@ -1,7 +1,8 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import QueuePool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./reviews.db")
 
@@ -9,7 +10,40 @@ connect_args: dict = {}
 if DATABASE_URL.startswith("sqlite"):
     connect_args["check_same_thread"] = False
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# An in-memory SQLite DB lives inside a single connection, so it keeps the
+# dialect's default pool; everything else gets a sized QueuePool.
+pool_args: dict = {}
+if make_url(DATABASE_URL).database not in (None, "", ":memory:"):
+    pool_args.update(poolclass=QueuePool, pool_size=5, max_overflow=10, pool_pre_ping=True)
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **pool_args)
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _):
+        """WAL lets readers proceed while a write is in progress."""
+        cursor = dbapi_conn.cursor()
+        for pragma in (
+            "journal_mode=WAL",
+            "synchronous=NORMAL",
+            "temp_store=MEMORY",
+            "cache_size=-64000",
+            "mmap_size=268435456",
+        ):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    # pysqlite only emits BEGIN before DML, so a SAVEPOINT opened first (e.g. the
+    # short-code retry) would commit on RELEASE. Let SQLAlchemy emit BEGIN itself.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
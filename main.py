@@ -1,22 +1,45 @@
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
 
 from database import Base, engine, get_configured_base_url
 from routes import api_router, public_router
+from services import get_anthropic_client
 
 load_dotenv()
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Review Boost")
+def init_db() -> None:
+    """Create tables and any missing indexes. Run once per deploy, not per worker."""
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced later.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+if os.getenv("CREATE_TABLES") == "1":
+    init_db()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the DB pool and the shared API client so the first request doesn't pay for them.
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    get_anthropic_client()
+    yield
+
+
+app = FastAPI(title="Review Boost", lifespan=lifespan)
 
 # ── Routers ──────────────────────────────────────────────────────────────────
 app.include_router(api_router)
@@ -25,17 +48,8 @@ app.include_router(public_router)
 # ── Static files ─────────────────────────────────────────────────────────────
 _static = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=_static), name="static")
-
-
-# ── Portal pages (served as static HTML) ─────────────────────────────────────
-@app.get("/portal/send")
-def portal_send():
-    return FileResponse(_static / "send.html")
-
-
-@app.get("/portal/dashboard")
-def portal_dashboard():
-    return FileResponse(_static / "dashboard.html")
+# Portal pages live at static/portal/<page>/index.html → /portal/<page>/
+app.mount("/portal", StaticFiles(directory=_static / "portal", html=True), name="portal")
 
 
 # ── Local dev entry point ────────────────────────────────────────────────────
@@ -55,6 +69,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     os.environ["SMS_BACKEND"] = args.sms_backend
+    init_db()  # once here in the parent; workers skip it
     port = int(os.getenv("PORT", "8000"))
 
     base = get_configured_base_url()
@@ -71,9 +86,16 @@ if __name__ == "__main__":
             public_url = ngrok.connect(port).public_url
             os.environ["BASE_URL"] = public_url
             logger.info("Public URL: %s", public_url)
-            logger.info("Portal:     %s/portal/send", public_url)
+            logger.info("Portal:     %s/portal/send/", public_url)
         except Exception as e:
             logger.warning("ngrok failed: %s", e)
             logger.warning("Fix: pip install pyngrok && ngrok config add-authtoken <token>")
 
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
+    # loop/http default to "auto": uvloop and httptools are used where
+    # uvicorn[standard] installs them, stdlib asyncio/h11 elsewhere.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", "3")),
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -8,6 +8,10 @@ from database import Base
 
 class Business(Base):
     __tablename__ = "businesses"
+    __table_args__ = (
+        # One row per Google place; concurrent get-or-creates race on this.
+        Index("ux_businesses_place_id", "google_place_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -19,6 +23,11 @@ class Business(Base):
 
 class ReviewRequest(Base):
     __tablename__ = "review_requests"
+    __table_args__ = (
+        # Dashboard counts filter on business_id (+ status) and list by created_at.
+        Index("ix_rr_business_status", "business_id", "status"),
+        Index("ix_rr_business_created", "business_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
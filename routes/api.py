@@ -1,15 +1,18 @@
 """JSON API endpoints — consumed by the portal frontend."""
 
+import asyncio
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from sqlalchemy import func
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from database import get_configured_base_url, get_db
 from models import Business, ReviewRequest
-from services import SMS_GATEWAYS, diagnose_sms, generate_review_text, generate_unique_short_code, resolve_google_place, send_sms
+from services import SMS_GATEWAYS, add_with_unique_short_codes, diagnose_sms, generate_review_text, resolve_google_place, send_sms, send_sms_bulk
 
 router = APIRouter(prefix="/api")
 
@@ -43,7 +46,9 @@ def resolve_place(url: str):
 
 @router.get("/businesses")
 def list_businesses(db: Session = Depends(get_db)):
-    rows = db.query(Business).order_by(Business.name).all()
+    rows = db.execute(
+        select(Business.id, Business.name, Business.google_place_id).order_by(Business.name)
+    ).all()
     return [
         {"id": b.id, "name": b.name, "google_place_id": b.google_place_id}
         for b in rows
@@ -51,7 +56,7 @@ def list_businesses(db: Session = Depends(get_db)):
 
 
 @router.post("/generate")
-def generate_reviews(request: Request, payload: dict, db: Session = Depends(get_db)):
+async def generate_reviews(request: Request, payload: dict, db: Session = Depends(get_db)):
     """Resolve business, generate reviews, create DB records with real links."""
     google_link = (payload.get("google_link") or "").strip()
     phones = [p.strip() for p in payload.get("phones", []) if p.strip()]
@@ -59,57 +64,96 @@ def generate_reviews(request: Request, payload: dict, db: Session = Depends(get_
     if not phones:
         return JSONResponse({"error": "At least one phone number is required."}, status_code=400)
 
-    place = resolve_google_place(google_link)
+    place = await run_in_threadpool(resolve_google_place, google_link)
     if not place:
         return JSONResponse(
             {"error": "Could not resolve Google link. Check GOOGLE_MAPS_API_KEY and the link."},
             status_code=400,
         )
 
-    biz = db.query(Business).filter(Business.google_place_id == place["place_id"]).first()
-    if not biz:
-        biz = Business(name=place["name"], google_place_id=place["place_id"])
-        db.add(biz)
-        db.commit()
-        db.refresh(biz)
+    # DB work runs in the threadpool, and no connection is held across the
+    # multi-second LLM calls below. The business is committed first so that
+    # a second submit for the same place during those calls reuses the row.
+    business_id, biz_name = await run_in_threadpool(_get_or_create_business, db, place)
 
-    base = _base_url(request)
-    reviews = []
-    for phone in phones:
-        try:
-            review_text = generate_review_text(biz.name)
-        except Exception as e:
+    review_texts = await asyncio.gather(
+        *(generate_review_text(biz_name) for _ in phones),
+        return_exceptions=True,
+    )
+    for review_text in review_texts:
+        if isinstance(review_text, Exception):
             return JSONResponse(
-                {"error": f"Failed to generate review text: {e}"},
+                {"error": f"Failed to generate review text: {review_text}"},
                 status_code=502,
             )
-        code = generate_unique_short_code(db)
-        link = f"{base}/r/{code}"
-        sms_body = f"Thanks for visiting {biz.name}! We'd love a quick Google review: {link}"
 
-        rr = ReviewRequest(
-            business_id=biz.id,
+    return await run_in_threadpool(
+        _save_review_requests, db, business_id, biz_name, phones, review_texts, _base_url(request)
+    )
+
+
+def _get_or_create_business(db: Session, place: dict) -> tuple[int, str]:
+    """Return (id, name) of the place's business, inserting and committing it if new.
+    Releases the connection afterwards.
+    """
+    stmt = select(Business.id, Business.name).where(Business.google_place_id == place["place_id"])
+    row = db.execute(stmt).first()
+    if row:
+        db.rollback()  # end the read transaction so the pooled connection goes back
+        return row.id, row.name
+
+    biz = Business(name=place["name"], google_place_id=place["place_id"])
+    db.add(biz)
+    try:
+        db.flush()
+        result = (biz.id, biz.name)
+        db.commit()
+    except IntegrityError:
+        # A concurrent request inserted the same place first; use its row.
+        db.rollback()
+        row = db.execute(stmt).one()
+        db.rollback()
+        result = (row.id, row.name)
+    return result
+
+
+def _save_review_requests(
+    db: Session,
+    business_id: int,
+    biz_name: str,
+    phones: list[str],
+    review_texts: list[str],
+    base: str,
+) -> dict:
+    """Insert one ReviewRequest per phone; return the API payload."""
+    rrs = [
+        ReviewRequest(
+            business_id=business_id,
             customer_contact=phone,
-            short_code=code,
             review_text=review_text,
             status="pending",
         )
-        db.add(rr)
-        db.commit()
-        db.refresh(rr)
+        for phone, review_text in zip(phones, review_texts)
+    ]
+    add_with_unique_short_codes(db, rrs)
 
+    # Build the response before committing: commit expires the instances.
+    reviews = []
+    for rr in rrs:
+        link = f"{base}/r/{rr.short_code}"
         reviews.append({
             "id": rr.id,
-            "phone": phone,
-            "review_text": review_text,
-            "sms_body": sms_body,
+            "phone": rr.customer_contact,
+            "review_text": rr.review_text,
+            "sms_body": f"Thanks for visiting {biz_name}! We'd love a quick Google review: {link}",
             "link": link,
         })
-
-    return {
-        "business_name": biz.name,
+    result = {
+        "business_name": biz_name,
         "reviews": reviews,
     }
+    db.commit()
+    return result
 
 
 @router.post("/send")
@@ -121,31 +165,42 @@ def send_review(payload: dict, db: Session = Depends(get_db)):
     if not items:
         return JSONResponse({"error": "No reviews to send."}, status_code=400)
 
-    sent_to: list[str] = []
-    failed: list[str] = []
-    errors: list[str] = []
+    ids = [item.get("id") for item in items if item.get("id")]
+    rrs = {rr.id: rr for rr in db.query(ReviewRequest).filter(ReviewRequest.id.in_(ids))}
+
+    sent_ids: list[int] = []
+    tasks: list[tuple[str, str]] = []
     for item in items:
-        rr_id = item.get("id")
         sms_body = (item.get("sms_body") or "").strip()
         review_text = (item.get("review_text") or "").strip()
 
-        rr = db.query(ReviewRequest).filter(ReviewRequest.id == rr_id).first()
+        rr = rrs.get(item.get("id"))
         if not rr:
             continue
 
         # Apply edits from preview
         if review_text:
             rr.review_text = review_text
-        rr.status = "sent"
-        rr.sent_at = datetime.now(timezone.utc)
+        sent_ids.append(rr.id)
+        tasks.append((rr.customer_contact, sms_body))
+
+    if sent_ids:
+        db.execute(
+            update(ReviewRequest)
+            .where(ReviewRequest.id.in_(sent_ids))
+            .values(status="sent", sent_at=datetime.now(timezone.utc))
+        )
         db.commit()
 
-        result = send_sms(to=rr.customer_contact, body=sms_body, carrier=carrier)
+    sent_to: list[str] = []
+    failed: list[str] = []
+    errors: list[str] = []
+    for (contact, _), result in zip(tasks, send_sms_bulk(tasks, carrier=carrier)):
         if result["ok"]:
-            sent_to.append(rr.customer_contact)
+            sent_to.append(contact)
         else:
-            failed.append(rr.customer_contact)
-            errors.append(f"{rr.customer_contact}: {result.get('error', 'unknown')}")
+            failed.append(contact)
+            errors.append(f"{contact}: {result.get('error', 'unknown')}")
 
     resp = {"sent": sent_to, "failed": failed}
     if errors:
@@ -155,21 +210,23 @@ def send_review(payload: dict, db: Session = Depends(get_db)):
 
 @router.get("/dashboard")
 def dashboard_stats(business_id: int, db: Session = Depends(get_db)):
-    total = db.query(func.count(ReviewRequest.id)).filter(
-        ReviewRequest.business_id == business_id
-    ).scalar()
-    clicked = db.query(func.count(ReviewRequest.id)).filter(
-        ReviewRequest.business_id == business_id,
-        ReviewRequest.status == "clicked",
-    ).scalar()
-
-    reviews = (
-        db.query(ReviewRequest)
-        .filter(ReviewRequest.business_id == business_id)
+    total, clicked = db.query(
+        func.count(ReviewRequest.id),
+        func.coalesce(func.sum(case((ReviewRequest.status == "clicked", 1), else_=0)), 0),
+    ).filter(ReviewRequest.business_id == business_id).one()
+
+    reviews = db.execute(
+        select(
+            ReviewRequest.id,
+            ReviewRequest.customer_contact,
+            ReviewRequest.status,
+            ReviewRequest.sent_at,
+            ReviewRequest.clicked_at,
+        )
+        .where(ReviewRequest.business_id == business_id)
         .order_by(ReviewRequest.created_at.desc())
         .limit(100)
-        .all()
-    )
+    ).all()
 
     return {
         "stats": {
@@ -192,7 +249,7 @@ def dashboard_stats(business_id: int, db: Session = Depends(get_db)):
 
 @router.delete("/review/{review_id}")
 def delete_review(review_id: int, db: Session = Depends(get_db)):
-    rr = db.query(ReviewRequest).filter(ReviewRequest.id == review_id).first()
+    rr = db.get(ReviewRequest, review_id)
     if not rr:
         return JSONResponse({"error": "Not found"}, status_code=404)
     db.delete(rr)
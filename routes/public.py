@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
 from database import get_db
@@ -12,28 +13,9 @@ from models import Business, ReviewRequest
 
 router = APIRouter()
 
-
-@router.get("/", response_class=RedirectResponse)
-def root():
-    return RedirectResponse("/portal/send")
-
-
-@router.get("/r/{code}", response_class=HTMLResponse)
-def review_landing(code: str, db: Session = Depends(get_db)):
-    rr = db.query(ReviewRequest).filter(ReviewRequest.short_code == code).first()
-    if not rr:
-        return HTMLResponse("<h1>Link not found</h1>", status_code=404)
-
-    if rr.status == "sent":
-        rr.status = "clicked"
-        rr.clicked_at = datetime.now(timezone.utc)
-        db.commit()
-
-    biz = db.query(Business).filter(Business.id == rr.business_id).first()
-    review_url = f"https://search.google.com/local/writereview?placeid={biz.google_place_id}"
-    review_text_json = json.dumps(rr.review_text)
-
-    return HTMLResponse(f"""\
+# Static shell of the landing page, pre-encoded once. Only the two JS constants
+# between _LANDING_PRE and _LANDING_POST vary per request.
+_LANDING_PRE = """\
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -41,14 +23,14 @@ def review_landing(code: str, db: Session = Depends(get_db)):
 <meta name="viewport" content="width=device-width,initial-scale=1">
 <title>Redirecting…</title>
 <style>
-  body {{ margin:0; display:flex; align-items:center; justify-content:center;
-         min-height:100vh; font-family:system-ui,sans-serif; background:#fafafa; color:#333; }}
-  .wrap {{ text-align:center; padding:2rem; }}
-  .btn {{ display:inline-block; margin:.5rem; padding:.6rem 1.2rem; border:none;
-          border-radius:.5rem; font-size:.9rem; cursor:pointer; text-decoration:none; }}
-  .copy {{ background:#ffe17c; color:#171e19; }}
-  .open {{ background:#171e19; color:#fff; }}
-  .hidden {{ display:none; }}
+  body { margin:0; display:flex; align-items:center; justify-content:center;
+         min-height:100vh; font-family:system-ui,sans-serif; background:#fafafa; color:#333; }
+  .wrap { text-align:center; padding:2rem; }
+  .btn { display:inline-block; margin:.5rem; padding:.6rem 1.2rem; border:none;
+          border-radius:.5rem; font-size:.9rem; cursor:pointer; text-decoration:none; }
+  .copy { background:#ffe17c; color:#171e19; }
+  .open { background:#171e19; color:#fff; }
+  .hidden { display:none; }
 </style>
 </head>
 <body>
@@ -56,30 +38,64 @@ def review_landing(code: str, db: Session = Depends(get_db)):
   <p id="status">Copying review &amp; redirecting to Google…</p>
   <div id="fallback" class="hidden">
     <button class="btn copy" onclick="doCopy()">Copy Review Text</button>
-    <a class="btn open" href="{review_url}">Open Google Reviews</a>
+    <a class="btn open" href="#">Open Google Reviews</a>
   </div>
 </div>
 <script>
-const reviewText = {review_text_json};
-const reviewUrl = "{review_url}";
-async function doCopy() {{
-  try {{
+""".encode()
+
+_LANDING_POST = """\
+document.querySelector('.open').href = reviewUrl;
+async function doCopy() {
+  try {
     await navigator.clipboard.writeText(reviewText);
     document.querySelector('.copy').textContent = 'Copied!';
-  }} catch(e) {{
+  } catch(e) {
     prompt('Copy this review:', reviewText);
-  }}
-}}
-(async () => {{
-  try {{
+  }
+}
+(async () => {
+  try {
     await navigator.clipboard.writeText(reviewText);
     document.getElementById('status').textContent = 'Review copied! Redirecting…';
-    setTimeout(() => {{ window.location.href = reviewUrl; }}, 1500);
-  }} catch(e) {{
+    setTimeout(() => { window.location.href = reviewUrl; }, 1500);
+  } catch(e) {
     document.getElementById('status').textContent = 'Tap Copy, then open Google Reviews.';
     document.getElementById('fallback').classList.remove('hidden');
-  }}
-}})();
+  }
+})();
 </script>
 </body>
-</html>""")
+</html>""".encode()
+
+
+@router.get("/", response_class=RedirectResponse)
+def root():
+    return RedirectResponse("/portal/send/")
+
+
+@router.get("/r/{code}", response_class=HTMLResponse)
+def review_landing(code: str, db: Session = Depends(get_db)):
+    # Read first so unknown and already-clicked links never take the write lock.
+    row = db.execute(
+        select(ReviewRequest.review_text, ReviewRequest.status, Business.google_place_id)
+        .join(Business, Business.id == ReviewRequest.business_id)
+        .where(ReviewRequest.short_code == code)
+    ).first()
+    if not row:
+        return HTMLResponse("<h1>Link not found</h1>", status_code=404)
+
+    if row.status == "sent":
+        # The status guard keeps the transition atomic against a concurrent click.
+        db.execute(
+            update(ReviewRequest)
+            .where(ReviewRequest.short_code == code, ReviewRequest.status == "sent")
+            .values(status="clicked", clicked_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+    review_url = f"https://search.google.com/local/writereview?placeid={row.google_place_id}"
+    review_text_json = json.dumps(row.review_text)
+
+    consts = f'const reviewText = {review_text_json};\nconst reviewUrl = "{review_url}";\n'
+    return HTMLResponse(b"".join((_LANDING_PRE, consts.encode(), _LANDING_POST)))
@@ -1,3 +1,3 @@
 from .google_places import resolve_google_place
-from .review import generate_review_text, generate_short_code, generate_unique_short_code
-from .sms import SMS_GATEWAYS, diagnose_sms, send_sms
+from .review import add_with_unique_short_codes, generate_review_text, generate_short_code, get_anthropic_client
+from .sms import SMS_GATEWAYS, diagnose_sms, send_sms, send_sms_bulk
@@ -1,21 +1,69 @@
-import json
+import http.cookiejar
 import logging
 import os
 import re
+import threading
+import time
 import urllib.parse
-import urllib.request
+
+import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+# Shared session so redirect follows and Places API calls reuse keep-alive
+# connections instead of paying a TCP+TLS handshake per request.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+# ...but no shared cookie jar: Google's consent/NID cookies from one user's
+# lookup must not leak into the next. Cookies still flow within one redirect chain.
+_SESSION.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+# Tried in order — earlier patterns are the more reliable signals.
+_MAPS_URL_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'<meta[^>]+content="(https://(?:www\.)?google\.[a-z.]+/maps/[^"]+)"',
+        r'<link[^>]+href="[^"]*?(https://(?:www\.)?google\.[a-z.]+/maps/[^"&]+)',
+        r'(https://(?:www\.)?google\.[a-z.]+/maps/(?:place|search)/[^\s"\'<>\\]+)',
+        r'(https://(?:www\.)?google\.[a-z.]+/maps/[^\s"\'<>\\]+)',
+        r'(https%3A%2F%2F(?:www\.)?google\.\w+%2Fmaps%2F[^\s"\'<>]+)',
+        r'<meta[^>]+content="\d+;\s*url=(https://[^"]+)"',
+        r'window\.location(?:\.href\s*=\s*|\.replace\s*\(\s*|\.assign\s*\(\s*)["\']'
+        r'(https://[^"\']+)',
+        r'href="(https://[^"]*google\.[^"]*\/maps\/[^"]+)"',
+    )
+]
+
+# Successful resolutions, keyed on the stripped input: {key: (expires_at, result)}.
+# Users often paste the same link again (resolve-place, then generate).
+_CACHE_TTL = 3600.0
+_CACHE_MAXSIZE = 1024
+_cache: dict[str, tuple[float, dict]] = {}
+_cache_lock = threading.Lock()
+
 
 def resolve_google_place(user_input: str) -> dict | None:
     """Resolve a Google Maps URL OR a business name to {name, place_id}."""
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY", "").strip()
     text = user_input.strip()
-
     if not text:
         return None
 
+    entry = _cache.get(text)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    result = _resolve_uncached(text)
+    if result:
+        with _cache_lock:
+            if text not in _cache and len(_cache) >= _CACHE_MAXSIZE:
+                _cache.pop(next(iter(_cache)))  # evict the oldest entry
+            _cache[text] = (time.monotonic() + _CACHE_TTL, result)
+    return result
+
+
+def _resolve_uncached(text: str) -> dict | None:
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY", "").strip()
     is_url = text.startswith("http") or "google.com/maps" in text or "goo.gl/" in text
 
     if is_url:
@@ -58,12 +106,6 @@ def resolve_google_place(user_input: str) -> dict | None:
 
 
 def _follow_redirects(url: str) -> str | None:
-    try:
-        import requests as req
-    except ImportError:
-        logger.error("'requests' not installed — run: pip install requests")
-        return None
-
     ua_strategies = [
         ("bot", {"User-Agent": "facebookexternalhit/1.1"}),
         ("browser", {
@@ -79,13 +121,19 @@ def _follow_redirects(url: str) -> str | None:
 
     for label, headers in ua_strategies:
         try:
-            resp = req.get(url, allow_redirects=True, timeout=15, headers=headers)
-            logger.info("%s UA — HTTP %s, final URL: %s", label, resp.status_code, resp.url)
+            # Stream so only the first 200 KB of the page is ever downloaded.
+            with _SESSION.get(
+                url, stream=True, allow_redirects=True, timeout=15, headers=headers
+            ) as resp:
+                logger.info("%s UA — HTTP %s, final URL: %s", label, resp.status_code, resp.url)
+
+                if "google.com/maps" in resp.url:
+                    return resp.url
 
-            if "google.com/maps" in resp.url:
-                return resp.url
+                head = resp.raw.read(200_000, decode_content=True)
+                body = head.decode(resp.encoding or "utf-8", errors="ignore")
 
-            maps_url = _find_maps_url_in_html(resp.text[:200_000])
+            maps_url = _find_maps_url_in_html(body)
             if maps_url:
                 logger.info("Found via %s UA: %s", label, maps_url)
                 return maps_url
@@ -96,19 +144,8 @@ def _follow_redirects(url: str) -> str | None:
 
 
 def _find_maps_url_in_html(body: str) -> str | None:
-    patterns = [
-        r'<meta[^>]+content="(https://(?:www\.)?google\.[a-z.]+/maps/[^"]+)"',
-        r'<link[^>]+href="[^"]*?(https://(?:www\.)?google\.[a-z.]+/maps/[^"&]+)',
-        r'(https://(?:www\.)?google\.[a-z.]+/maps/(?:place|search)/[^\s"\'<>\\]+)',
-        r'(https://(?:www\.)?google\.[a-z.]+/maps/[^\s"\'<>\\]+)',
-        r'(https%3A%2F%2F(?:www\.)?google\.\w+%2Fmaps%2F[^\s"\'<>]+)',
-        r'<meta[^>]+content="\d+;\s*url=(https://[^"]+)"',
-        r'window\.location(?:\.href\s*=\s*|\.replace\s*\(\s*|\.assign\s*\(\s*)["\']'
-        r'(https://[^"\']+)',
-        r'href="(https://[^"]*google\.[^"]*\/maps\/[^"]+)"',
-    ]
-    for pattern in patterns:
-        m = re.search(pattern, body, re.IGNORECASE)
+    for pattern in _MAPS_URL_PATTERNS:
+        m = pattern.search(body)
         if m:
             found = m.group(1)
             if "%" in found:
@@ -156,19 +193,17 @@ def _find_place_from_text(
             }
         }
     try:
-        body_bytes = json.dumps(body_dict).encode("utf-8")
-        req = urllib.request.Request(
+        resp = _SESSION.post(
             "https://places.googleapis.com/v1/places:searchText",
-            data=body_bytes,
+            json=body_dict,
             headers={
-                "Content-Type": "application/json",
                 "X-Goog-Api-Key": api_key,
                 "X-Goog-FieldMask": "places.id,places.displayName",
             },
-            method="POST",
+            timeout=10,
         )
-        resp = urllib.request.urlopen(req, timeout=10)
-        data = json.loads(resp.read())
+        resp.raise_for_status()
+        data = resp.json()
         places = data.get("places", [])
         logger.info("Places API response: %d results", len(places))
         if places:
@@ -184,15 +219,16 @@ def _find_place_from_text(
 
 def _get_place_name(place_id: str, api_key: str) -> str | None:
     try:
-        req = urllib.request.Request(
+        resp = _SESSION.get(
             f"https://places.googleapis.com/v1/places/{place_id}",
             headers={
                 "X-Goog-Api-Key": api_key,
                 "X-Goog-FieldMask": "displayName",
             },
+            timeout=10,
         )
-        resp = urllib.request.urlopen(req, timeout=10)
-        data = json.loads(resp.read())
+        resp.raise_for_status()
+        data = resp.json()
         return data.get("displayName", {}).get("text")
     except Exception as e:
         logger.error("Place Details API error: %s", e)
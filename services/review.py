@@ -1,7 +1,9 @@
+import functools
 import secrets
 import string
 
 import anthropic
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 
@@ -10,26 +12,44 @@ def generate_short_code(length: int = 7) -> str:
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
-def generate_unique_short_code(db: Session, max_retries: int = 5) -> str:
-    """Generate a short code guaranteed unique in the DB. Retries on collision."""
-    from models import ReviewRequest
+def add_with_unique_short_codes(db: Session, review_requests: list, max_retries: int = 5) -> None:
+    """Assign short codes and flush the rows. Retries on collision.
 
+    The UNIQUE index on short_code does the checking, so the common path is a
+    single INSERT round trip with no SELECT pre-check. Each attempt runs in a
+    SAVEPOINT, so a collision never rolls back the caller's transaction.
+    Any other integrity error (FK, NOT NULL, ...) is re-raised at once.
+    """
+    last_exc = None
     for attempt in range(max_retries):
-        code = generate_short_code()
-        exists = db.query(ReviewRequest.id).filter(
-            ReviewRequest.short_code == code
-        ).first()
-        if not exists:
-            return code
-    raise RuntimeError(f"Failed to generate unique short code after {max_retries} attempts")
+        for rr in review_requests:
+            rr.short_code = generate_short_code()
+        try:
+            with db.begin_nested():
+                db.add_all(review_requests)
+                db.flush()
+            return
+        except IntegrityError as e:
+            # SQLite: "UNIQUE constraint failed: review_requests.short_code";
+            # PostgreSQL: "... DETAIL: Key (short_code)=(...) already exists."
+            if "short_code" not in str(e.orig):
+                raise
+            last_exc = e
+    raise RuntimeError(f"Failed to generate unique short codes after {max_retries} attempts") from last_exc
 
 
-def generate_review_text(business_name: str, timeout: float = 30.0) -> str:
+@functools.lru_cache(maxsize=1)
+def get_anthropic_client() -> anthropic.AsyncAnthropic:
+    """Shared client so every call reuses the same keep-alive connection pool."""
+    return anthropic.AsyncAnthropic(timeout=30.0)
+
+
+async def generate_review_text(business_name: str, timeout: float = 30.0) -> str:
     """Generate AI review text. Raises on API failure or empty response."""
-    client = anthropic.Anthropic(timeout=timeout)
-    message = client.messages.create(
+    message = await get_anthropic_client().messages.create(
         model="claude-sonnet-4-5-20250929",
         max_tokens=200,
+        timeout=timeout,
         messages=[
             {
                 "role": "user",
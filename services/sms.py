@@ -1,6 +1,7 @@
 import logging
 import os
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
@@ -14,51 +15,76 @@ SMS_GATEWAYS = {
 }
 
 
-def _send_email_internal(to: str, subject: str, body: str) -> dict:
-    """Send email. Returns {"ok": True} or {"ok": False, "error": "reason"}."""
+def _smtp_settings() -> dict | None:
+    """SMTP connection settings from env, or None if credentials are missing."""
     smtp_user = os.getenv("SMTP_USER", "").strip()
     smtp_pass = os.getenv("SMTP_PASSWORD", "").strip()
     if not smtp_user or not smtp_pass:
-        return {"ok": False, "error": "SMTP_USER or SMTP_PASSWORD env var is missing"}
+        return None
+    return {
+        "host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": smtp_user,
+        "password": smtp_pass,
+        "from_email": os.getenv("FROM_EMAIL", smtp_user),
+    }
 
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    from_email = os.getenv("FROM_EMAIL", smtp_user)
 
+def _smtp_error(e: Exception) -> str:
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        return f"SMTP auth failed (check SMTP_USER/SMTP_PASSWORD): {e}"
+    if isinstance(e, smtplib.SMTPException):
+        return f"SMTP error: {e}"
+    return f"Email send error: {e}"
+
+
+def _build_email(from_email: str, to: str, subject: str, body: str) -> str:
     msg = MIMEMultipart("alternative")
     msg["From"] = from_email
     msg["To"] = to
     msg["Subject"] = subject
     msg.attach(MIMEText(body, "html"))
+    return msg.as_string()
+
+
+def _send_email_internal(to: str, subject: str, body: str) -> dict:
+    """Send email. Returns {"ok": True} or {"ok": False, "error": "reason"}."""
+    smtp = _smtp_settings()
+    if not smtp:
+        return {"ok": False, "error": "SMTP_USER or SMTP_PASSWORD env var is missing"}
 
     try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
+        with smtplib.SMTP(smtp["host"], smtp["port"]) as server:
             server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(from_email, to, msg.as_string())
+            server.login(smtp["user"], smtp["password"])
+            server.sendmail(smtp["from_email"], to, _build_email(smtp["from_email"], to, subject, body))
         return {"ok": True}
-    except smtplib.SMTPAuthenticationError as e:
-        return {"ok": False, "error": f"SMTP auth failed (check SMTP_USER/SMTP_PASSWORD): {e}"}
-    except smtplib.SMTPException as e:
-        return {"ok": False, "error": f"SMTP error: {e}"}
     except Exception as e:
-        return {"ok": False, "error": f"Email send error: {e}"}
+        return {"ok": False, "error": _smtp_error(e)}
 
 
-def _send_sms_via_email(to: str, body: str, carrier: str) -> dict:
-    """Send SMS via carrier email gateway. Returns {"ok": True/False, "error": ...}."""
+def _sms_gateway_address(to: str, carrier: str) -> tuple[str | None, str | None]:
+    """Map a phone number to its carrier gateway address. Returns (address, error)."""
     entry = SMS_GATEWAYS.get(carrier)
     if not entry:
-        return {"ok": False, "error": f"Unknown carrier: '{carrier}'. Supported: {list(SMS_GATEWAYS.keys())}"}
+        return None, f"Unknown carrier: '{carrier}'. Supported: {list(SMS_GATEWAYS.keys())}"
     gateway = entry["gateway"]
 
     digits = "".join(c for c in to if c.isdigit())
     if digits.startswith("1") and len(digits) == 11:
         digits = digits[1:]
     if len(digits) != 10:
-        return {"ok": False, "error": f"Invalid US phone number: {to}"}
+        return None, f"Invalid US phone number: {to}"
+
+    return f"{digits}@{gateway}", None
+
+
+def _send_sms_via_email(to: str, body: str, carrier: str) -> dict:
+    """Send SMS via carrier email gateway. Returns {"ok": True/False, "error": ...}."""
+    sms_email, error = _sms_gateway_address(to, carrier)
+    if error:
+        return {"ok": False, "error": error}
 
-    sms_email = f"{digits}@{gateway}"
     result = _send_email_internal(to=sms_email, subject="", body=body)
     if result["ok"]:
         logger.info("SMS-GW sent to %s via %s", to, sms_email)
@@ -67,6 +93,53 @@ def _send_sms_via_email(to: str, body: str, carrier: str) -> dict:
     return result
 
 
+def _send_bulk_via_email(items: list[tuple[str, str]], carrier: str) -> list[dict]:
+    """Send several SMS over ONE SMTP connection (single STARTTLS + login).
+    Returns one {"ok": True/False, "error": ...} per item, in order.
+    """
+    results: list[dict | None] = [None] * len(items)
+    recipients = []
+    for i, (to, body) in enumerate(items):
+        sms_email, error = _sms_gateway_address(to, carrier)
+        if error:
+            results[i] = {"ok": False, "error": error}
+        else:
+            recipients.append((i, to, sms_email, body))
+
+    if recipients:
+        smtp = _smtp_settings()
+        if not smtp:
+            connection_error = "SMTP_USER or SMTP_PASSWORD env var is missing"
+        else:
+            connection_error = None
+            try:
+                with smtplib.SMTP(smtp["host"], smtp["port"]) as server:
+                    server.starttls()
+                    server.login(smtp["user"], smtp["password"])
+                    for i, to, sms_email, body in recipients:
+                        try:
+                            server.sendmail(
+                                smtp["from_email"],
+                                sms_email,
+                                _build_email(smtp["from_email"], sms_email, "", body),
+                            )
+                            results[i] = {"ok": True}
+                            logger.info("SMS-GW sent to %s via %s", to, sms_email)
+                        except smtplib.SMTPException as e:
+                            results[i] = {"ok": False, "error": _smtp_error(e)}
+                            logger.error("SMS-GW error: %s", results[i]["error"])
+            except Exception as e:
+                connection_error = _smtp_error(e)
+                logger.error("SMS-GW error: %s", connection_error)
+
+        # Anything not attempted failed with the connection/login error.
+        for i, *_ in recipients:
+            if results[i] is None:
+                results[i] = {"ok": False, "error": connection_error}
+
+    return results
+
+
 def _send_via_twilio(to: str, body: str) -> dict:
     """Send SMS via Twilio. Returns {"ok": True/False, "error": ...}."""
     sid = os.getenv("TWILIO_ACCOUNT_SID")
@@ -140,3 +213,21 @@ def send_sms(to: str, body: str, carrier: str = "") -> dict:
     if not carrier:
         return {"ok": False, "error": f"Email backend requires carrier selection. SMS_BACKEND={backend}"}
     return _send_sms_via_email(to, body, carrier)
+
+
+def send_sms_bulk(items: list[tuple[str, str]], carrier: str = "") -> list[dict]:
+    """Send many SMS given (to, body) pairs. Returns one result per item, in order.
+    The email backend reuses a single SMTP session; Twilio sends run concurrently.
+    """
+    if not items:
+        return []
+    backend = os.getenv("SMS_BACKEND", "twilio").lower()
+
+    if backend == "twilio":
+        with ThreadPoolExecutor(max_workers=min(8, len(items))) as executor:
+            return list(executor.map(lambda item: _send_via_twilio(*item), items))
+
+    if not carrier:
+        error = f"Email backend requires carrier selection. SMS_BACKEND={backend}"
+        return [{"ok": False, "error": error} for _ in items]
+    return _send_bulk_via_email(items, carrier)
@@ -1,34 +1,123 @@
+import contextlib
+import logging
+import os
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 from starlette.testclient import TestClient
 
-from database import Base, get_db
-from main import app
+# Keep the app's own engine (touched by the lifespan warm-up) in RAM as well.
+# Must be set before database.py is imported.
+os.environ["DATABASE_URL"] = "sqlite://"
 
-engine = create_engine(
-    "sqlite:///:memory:",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestSession = sessionmaker(bind=engine)
+from database import Base, get_db  # noqa: E402
+from models import Business  # noqa: E402
 
 
-@pytest.fixture()
-def db():
+@pytest.fixture(scope="session", autouse=True)
+def _quiet_logging():
+    """Skip log record formatting from the services during tests."""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """One in-memory database per test session; the schema is created once."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     Base.metadata.create_all(bind=engine)
-    session = TestSession()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(engine):
+    """Session inside an outer transaction that is rolled back after the test.
+    Commits made by the test or the app only release savepoints.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
+def business_template():
+    """Column values for a test Business. Mapped instances can't be shallow-copied
+    (the copy would share the original's instance state), so build from these.
+    """
+    return {"name": "Test Biz", "google_place_id": "place123"}
 
 
 @pytest.fixture()
-def client(db):
-    app.dependency_overrides[get_db] = lambda: db
+def business(db, business_template):
+    """A Business added to the test session; it is written by the test's own commit."""
+    biz = Business(**business_template)
+    db.add(biz)
+    return biz
+
+
+@pytest.fixture()
+def count_queries(engine):
+    """Context manager collecting the SQL statements sent to the test DB.
+    Savepoint bookkeeping from the db fixture is not counted.
+    """
+    @contextlib.contextmanager
+    def _count_queries():
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, *args):
+            if not statement.startswith(("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK")):
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+    return _count_queries
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The FastAPI app, imported on first use rather than at collection."""
+    from main import app
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def app_client(app):
+    """One TestClient (and one app lifespan) for the whole session."""
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture()
+def client(app, app_client, db):
+    app.dependency_overrides[get_db] = lambda: db
+    yield app_client
     app.dependency_overrides.clear()
@@ -1,15 +1,77 @@
-from unittest.mock import patch
+import smtplib
+from datetime import datetime, timezone
+
+import pytest
+import time_machine
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 
 from models import Business, ReviewRequest
+from routes import api
+from services import review, sms
+
+CLICK_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+# Plain-function fakes: no call recording is needed, so no MagicMock machinery.
+def fake_resolve(*args, **kwargs):
+    return {"name": "Test Biz", "place_id": "place123"}
+
+
+async def fake_review_text(*args, **kwargs):
+    return "Great place!"
+
+
+def fake_short_code(*args, **kwargs):
+    return "tstcode"
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; records calls on the class so tests can inspect them."""
+
+    calls: list = []
+    login_error: Exception | None = None
+    reject: set = set()
+
+    def __init__(self, host, port):
+        self.calls.append(("connect", host, port))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        self.calls.append(("starttls",))
 
+    def login(self, user, password):
+        self.calls.append(("login", user, password))
+        if self.login_error:
+            raise self.login_error
 
-def test_generate_reviews(client, db):
+    def sendmail(self, from_addr, to_addr, msg):
+        self.calls.append(("sendmail", to_addr))
+        if to_addr in self.reject:
+            raise smtplib.SMTPRecipientsRefused({to_addr: (550, b"mailbox unavailable")})
+
+
+def fake_smtp(monkeypatch, login_error=None, reject=()):
+    monkeypatch.setenv("SMS_BACKEND", "email")
+    monkeypatch.setenv("SMTP_USER", "user@example.com")
+    monkeypatch.setenv("SMTP_PASSWORD", "secret")
+    smtp = type("FakeSMTP", (FakeSMTP,), {"calls": [], "login_error": login_error, "reject": set(reject)})
+    monkeypatch.setattr(sms.smtplib, "SMTP", smtp)
+    return smtp
+
+
+def test_generate_reviews(client, db, monkeypatch, count_queries):
     """POST /api/generate creates Business + ReviewRequest and returns review data."""
-    with (
-        patch("routes.api.resolve_google_place", return_value={"name": "Test Biz", "place_id": "place123"}),
-        patch("routes.api.generate_review_text", return_value="Great place!"),
-        patch("routes.api.generate_unique_short_code", return_value="tstcode"),
-    ):
+    monkeypatch.setattr(api, "resolve_google_place", fake_resolve)
+    monkeypatch.setattr(api, "generate_review_text", fake_review_text)
+    monkeypatch.setattr(review, "generate_short_code", fake_short_code)
+
+    with count_queries() as queries:
         resp = client.post("/api/generate", json={
             "google_link": "https://maps.google.com/test",
             "phones": ["1234567890"],
@@ -20,21 +82,18 @@ def test_generate_reviews(client, db):
     assert data["business_name"] == "Test Biz"
     assert len(data["reviews"]) == 1
     assert data["reviews"][0]["review_text"] == "Great place!"
-    assert "/r/tstcode" in data["reviews"][0]["link"]
+    assert b"/r/tstcode" in resp.content
+    # Business lookup + Business insert + ReviewRequest insert.
+    assert len(queries) <= 4, queries
 
-    assert db.query(Business).count() == 1
+    assert db.scalar(select(func.count()).select_from(Business)) == 1
     assert db.query(ReviewRequest).filter_by(short_code="tstcode").first() is not None
 
 
-def test_short_link_click(client, db):
+def test_short_link_click(client, db, count_queries, business):
     """GET /r/{code} returns clipboard HTML and marks status as clicked."""
-    biz = Business(name="Test Biz", google_place_id="place123")
-    db.add(biz)
-    db.commit()
-    db.refresh(biz)
-
     rr = ReviewRequest(
-        business_id=biz.id,
+        business=business,
         customer_contact="1234567890",
         short_code="abc",
         review_text="Wonderful service!",
@@ -43,11 +102,160 @@ def test_short_link_click(client, db):
     db.add(rr)
     db.commit()
 
-    resp = client.get("/r/abc")
+    with count_queries() as queries, time_machine.travel(CLICK_TIME, tick=False):
+        resp = client.get("/r/abc")
     assert resp.status_code == 200
-    assert "Wonderful service!" in resp.text
-    assert "place123" in resp.text
+    # One SELECT with the business joined in, then the status update.
+    assert len(queries) == 2, queries
+    assert "JOIN businesses" in queries[0]
+    assert queries[1].startswith("UPDATE review_requests")
+    assert b"Wonderful service!" in resp.content
+    assert b"place123" in resp.content
 
-    db.refresh(rr)
+    db.expire(rr, ["status", "clicked_at"])
     assert rr.status == "clicked"
-    assert rr.clicked_at is not None
+    assert rr.clicked_at == CLICK_TIME.replace(tzinfo=None)  # SQLite stores naive UTC
+
+
+def test_short_link_click_already_clicked(client, db, count_queries, business):
+    """GET /r/{code} on a non-'sent' link only reads; no UPDATE, no write lock."""
+    db.add(ReviewRequest(
+        business=business,
+        customer_contact="1234567890",
+        short_code="done",
+        review_text="Wonderful service!",
+        status="clicked",
+    ))
+    db.commit()
+
+    with count_queries() as queries:
+        resp = client.get("/r/done")
+    assert resp.status_code == 200
+    assert len(queries) == 1, queries
+
+    with count_queries() as queries:
+        assert client.get("/r/missing").status_code == 404
+    assert len(queries) == 1, queries
+
+
+def test_generate_reviews_short_code_collision(client, db, monkeypatch, business):
+    """A short-code collision retries inside a savepoint; earlier work survives."""
+    db.add(ReviewRequest(
+        business=business,
+        customer_contact="0000000000",
+        short_code="dup",
+        review_text="Existing",
+    ))
+    db.commit()
+
+    # First attempt draws ("dup", "spare") and collides; the retry draws fresh codes.
+    codes = iter(["dup", "spare", "new1", "new2"])
+    monkeypatch.setattr(
+        api, "resolve_google_place", lambda *a, **kw: {"name": "Other Biz", "place_id": "place456"}
+    )
+    monkeypatch.setattr(api, "generate_review_text", fake_review_text)
+    monkeypatch.setattr(review, "generate_short_code", lambda: next(codes))
+
+    resp = client.post("/api/generate", json={
+        "google_link": "https://maps.google.com/other",
+        "phones": ["1234567890", "2345678901"],
+    })
+
+    assert resp.status_code == 200
+    assert [r["link"].rsplit("/", 1)[1] for r in resp.json()["reviews"]] == ["new1", "new2"]
+    assert db.scalar(select(func.count()).select_from(Business)) == 2
+    codes_in_db = db.scalars(select(ReviewRequest.short_code).order_by(ReviewRequest.id)).all()
+    assert codes_in_db == ["dup", "new1", "new2"]
+
+
+def test_send_reviews(client, db, monkeypatch, count_queries, business):
+    """POST /api/send marks rows sent in one UPDATE, keeps edits, skips unknown ids."""
+    smtp = fake_smtp(monkeypatch)
+    rrs = [
+        ReviewRequest(business=business, customer_contact=phone, short_code=code, review_text="Old")
+        for phone, code in (("5550000001", "s1"), ("5550000002", "s2"))
+    ]
+    db.add_all(rrs)
+    db.commit()
+    first, second = (rr.id for rr in rrs)
+
+    with count_queries() as queries, time_machine.travel(CLICK_TIME, tick=False):
+        resp = client.post("/api/send", json={
+            "carrier": "verizon",
+            "reviews": [
+                {"id": second, "sms_body": "two", "review_text": "Edited"},
+                {"id": 999999, "sms_body": "ghost"},
+                {"id": first, "sms_body": "one"},
+            ],
+        })
+
+    assert resp.status_code == 200
+    assert resp.json() == {"sent": ["5550000002", "5550000001"], "failed": []}
+    # IN load, the review_text edit, then one bulk status UPDATE.
+    assert len(queries) == 3, queries
+    assert [c[1] for c in smtp.calls if c[0] == "sendmail"] == ["5550000002@vtext.com", "5550000001@vtext.com"]
+
+    db.expire_all()
+    assert [(rr.status, rr.sent_at, rr.review_text) for rr in rrs] == [
+        ("sent", CLICK_TIME.replace(tzinfo=None), "Old"),
+        ("sent", CLICK_TIME.replace(tzinfo=None), "Edited"),
+    ]
+
+
+def test_send_sms_bulk_single_login(monkeypatch):
+    """Bulk email sends log in once; bad numbers and refused recipients fail per item, in order."""
+    smtp = fake_smtp(monkeypatch, reject={"5550000002@vtext.com"})
+
+    results = sms.send_sms_bulk(
+        [("555-000-0001", "a"), ("123", "b"), ("+1 555 000 0002", "c"), ("5550000003", "d")],
+        carrier="verizon",
+    )
+
+    assert results[0] == {"ok": True}
+    assert results[1] == {"ok": False, "error": "Invalid US phone number: 123"}
+    assert results[2]["ok"] is False and results[2]["error"].startswith("SMTP error: ")
+    assert results[3] == {"ok": True}
+    assert [c for c in smtp.calls if c[0] == "login"] == [("login", "user@example.com", "secret")]
+    assert [c[1] for c in smtp.calls if c[0] == "sendmail"] == [
+        "5550000001@vtext.com",
+        "5550000002@vtext.com",
+        "5550000003@vtext.com",
+    ]
+
+
+def test_send_sms_bulk_login_failure(monkeypatch):
+    """A failed login marks every remaining item failed and sends nothing."""
+    smtp = fake_smtp(monkeypatch, login_error=smtplib.SMTPAuthenticationError(535, b"bad credentials"))
+
+    results = sms.send_sms_bulk([("5550000001", "a"), ("bad", "b"), ("5550000002", "c")], carrier="verizon")
+
+    assert [r["ok"] for r in results] == [False, False, False]
+    assert results[1]["error"] == "Invalid US phone number: bad"
+    for r in (results[0], results[2]):
+        assert r["error"].startswith("SMTP auth failed")
+    assert [c[0] for c in smtp.calls].count("login") == 1
+    assert not [c for c in smtp.calls if c[0] == "sendmail"]
+
+
+def test_short_code_retry_errors(db, business, monkeypatch):
+    """Only short_code collisions are retried; other integrity errors surface at once,
+    and giving up keeps the last collision as the cause.
+    """
+    codes = iter(["first", "second"])
+    monkeypatch.setattr(review, "generate_short_code", lambda: next(codes))
+    db.flush()
+    rr = ReviewRequest(business_id=business.id, customer_contact="1234567890", review_text=None)
+
+    with pytest.raises(IntegrityError, match="review_text"):
+        review.add_with_unique_short_codes(db, [rr])
+    assert next(codes) == "second"  # no retry was attempted
+
+    db.rollback()
+    db.add(ReviewRequest(business=business, customer_contact="0", short_code="dup", review_text="x"))
+    db.flush()
+    monkeypatch.setattr(review, "generate_short_code", lambda: "dup")
+    rr = ReviewRequest(business_id=business.id, customer_contact="1234567890", review_text="y")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        review.add_with_unique_short_codes(db, [rr], max_retries=2)
+    assert isinstance(excinfo.value.__cause__, IntegrityError)